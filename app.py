@@ -2,6 +2,7 @@ import streamlit as st
 import os
 from mcp_chatbot import MCPChatbot
 import time
+import uuid
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -105,6 +106,24 @@ def main():
     if "chatbot" not in st.session_state:
         st.session_state.chatbot = initialize_chatbot()
     
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = str(uuid.uuid4())
+    
+    # Load metrics shared by all sessions
+    if st.session_state.chatbot:
+        with st.sidebar:
+            st.header("📈 Load")
+            metrics = st.session_state.chatbot.get_metrics()
+            load_col1, load_col2 = st.columns(2)
+            load_col1.metric("Queue depth", metrics["queue_depth"])
+            load_col2.metric("Rejected", metrics["rejected_total"])
+            st.caption(
+                f"Admitted: {metrics['admitted']} · "
+                f"Over quota: {metrics['rejected_user_quota']} · "
+                f"Queue full: {metrics['rejected_queue_full']} · "
+                f"Timed out: {metrics['rejected_timeout']}"
+            )
+    
     # Main content area
     col1, col2 = st.columns([2, 1])
     
@@ -174,7 +193,8 @@ def main():
             
             bot_response = st.session_state.chatbot.get_response(
                 current_question, 
-                conversation_history[:-1]  # Exclude the current message
+                conversation_history[:-1],  # Exclude the current message
+                user_id=st.session_state.session_id
             )
         
         # Add bot response to history
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Knowledge base ingestion pipeline for Markdown documentation
+
+Turns a directory of Markdown files (e.g. code_examples.md and internal docs)
+into knowledge base entries that MCPKnowledgeBase can load alongside
+knowledge_base.json. Files are parsed, chunked into passages, and each passage
+tokenized and stemmed in a process pool, so MCPKnowledgeBase indexes the
+precomputed terms instead of re-tokenizing at load time. Only files whose
+content hash changed are re-processed. Search matches individual passages, so
+only the best passage of a long section is sent to the model. No embeddings
+are computed: retrieval in MCPKnowledgeBase is lexical, so vectors would go
+unused.
+
+Usage:
+    python kb_ingest.py docs/ code_examples.md
+    python kb_ingest.py docs/ --output ingested_kb.json --workers 8
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from query_normalizer import stem, tokenize
+
+DEFAULT_OUTPUT = "ingested_kb.json"
+DEFAULT_CACHE_DIR = ".kb_cache"
+MANIFEST_NAME = "manifest.json"
+
+# Bump when parsing or entry format changes so cached shards are rebuilt
+PIPELINE_VERSION = 4
+
+# Chunking parameters
+CHUNK_WORDS = 200
+CHUNK_OVERLAP = 40
+
+HEADING_RE = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+FENCE_RE = re.compile(r'^\s*(```|~~~)')
+
+
+def pipeline_signature() -> str:
+    """Identify the settings that shape a shard's content"""
+    return f"v{PIPELINE_VERSION}:words={CHUNK_WORDS}:overlap={CHUNK_OVERLAP}"
+
+
+def file_hash(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def slugify(text: str) -> str:
+    """Turn a heading or path into a knowledge base key fragment"""
+    return re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_') or "section"
+
+
+def parse_markdown(text: str) -> List[Tuple[str, str]]:
+    """Split Markdown into (heading, body) sections
+
+    Headings inside fenced code blocks are ignored, so comments in code
+    samples (``# Initialize server``) do not start new sections. Text before
+    the first heading is returned under an empty heading.
+    """
+    sections = []
+    heading = ""
+    body: List[str] = []
+    in_fence = False
+
+    for line in text.splitlines():
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        match = None if in_fence else HEADING_RE.match(line)
+        if match:
+            if heading or any(l.strip() for l in body):
+                sections.append((heading, "\n".join(body).strip()))
+            heading = match.group(2)
+            body = []
+        else:
+            body.append(line)
+
+    if heading or any(l.strip() for l in body):
+        sections.append((heading, "\n".join(body).strip()))
+    return sections
+
+
+def _split_blocks(text: str) -> List[str]:
+    """Split Markdown into paragraphs and whole fenced code blocks, keeping their lines intact"""
+    blocks = []
+    current: List[str] = []
+    in_fence = False
+
+    for line in text.splitlines():
+        if FENCE_RE.match(line):
+            if not in_fence and current:
+                blocks.append("\n".join(current))
+                current = []
+            current.append(line)
+            if in_fence:
+                blocks.append("\n".join(current))
+                current = []
+            in_fence = not in_fence
+        elif in_fence:
+            current.append(line)
+        elif not line.strip():
+            if current:
+                blocks.append("\n".join(current))
+                current = []
+        else:
+            current.append(line)
+
+    if current:
+        blocks.append("\n".join(current))
+    return blocks
+
+
+def _split_large_block(block: str, size: int) -> List[str]:
+    """Split one oversized block on line boundaries
+
+    Each piece of a fenced block is re-opened and re-closed with the
+    original fence, so every chunk stays valid Markdown.
+    """
+    lines = block.split("\n")
+    opener = closer = None
+    if FENCE_RE.match(lines[0]):
+        opener = lines.pop(0)
+        fence = FENCE_RE.match(opener).group(1)
+        closer = lines.pop() if lines and FENCE_RE.match(lines[-1]) else fence
+
+    if opener is None:
+        # A prose line longer than a whole chunk can only be split on words
+        wrapped = []
+        for line in lines:
+            line_words = line.split()
+            if len(line_words) <= size:
+                wrapped.append(line)
+            else:
+                wrapped.extend(" ".join(line_words[i:i + size]) for i in range(0, len(line_words), size))
+        lines = wrapped
+
+    pieces = []
+    current: List[str] = []
+    words = 0
+    for line in lines:
+        line_words = len(line.split())
+        if current and words + line_words > size:
+            pieces.append(current)
+            current, words = [], 0
+        current.append(line)
+        words += line_words
+    if current:
+        pieces.append(current)
+
+    if opener is None:
+        return ["\n".join(piece) for piece in pieces]
+    return ["\n".join([opener] + piece + [closer]) for piece in pieces]
+
+
+def chunk_text(text: str, size: int = CHUNK_WORDS, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """Split text into chunks of roughly `size` words on paragraph boundaries
+
+    Original line breaks and indentation are kept, and fenced code blocks
+    are never cut mid-block (an oversized block is split on lines and each
+    piece re-fenced). Up to `overlap` words of trailing paragraphs are
+    repeated at the start of the next chunk.
+    """
+    blocks = []
+    for block in _split_blocks(text):
+        if len(block.split()) > size:
+            blocks.extend(_split_large_block(block, size))
+        else:
+            blocks.append(block)
+    if not blocks:
+        return []
+
+    chunks = []
+    current: List[str] = []
+    carried = 0  # leading blocks in `current` repeated from the previous chunk
+    for block in blocks:
+        block_words = len(block.split())
+        current_words = sum(len(b.split()) for b in current)
+        if current and current_words + block_words > size:
+            tail: List[str] = []
+            tail_words = 0
+            if len(current) > carried:
+                chunks.append("\n\n".join(current))
+                # Carry trailing blocks that fit in the overlap into the next chunk
+                for previous in reversed(current):
+                    previous_words = len(previous.split())
+                    if tail_words + previous_words > overlap:
+                        break
+                    tail.insert(0, previous)
+                    tail_words += previous_words
+            if tail_words + block_words > size:
+                tail = []
+            current, carried = tail, len(tail)
+        current.append(block)
+
+    if len(current) > carried:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def _index_passage(title: str, text: str) -> Dict[str, Any]:
+    """Passage text plus the word counts and stems MCPKnowledgeBase searches
+
+    Terms cover the title and the passage, matching the text the knowledge
+    base would otherwise tokenize itself.
+    """
+    tokens = Counter(tokenize(f"{title} {text}"))
+    return {
+        "text": text,
+        "tokens": dict(tokens),
+        "stems": sorted({stem(word) for word in tokens}),
+    }
+
+
+def process_file(path: str, rel_path: str, chunk_words: int = CHUNK_WORDS,
+                 chunk_overlap: int = CHUNK_OVERLAP) -> List[Tuple[str, Dict[str, Any]]]:
+    """Parse, chunk, tokenize and stem one Markdown file
+
+    Runs in a worker process. Returns (key, entry) pairs in document order.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    stem = slugify(os.path.splitext(rel_path)[0])
+    doc_title = Path(rel_path).stem.replace('_', ' ').title()
+    entries = []
+    seen_keys = set()
+
+    for heading, body in parse_markdown(text):
+        if not body:
+            continue
+        base_key = f"{stem}__{slugify(heading)}" if heading else stem
+        # Repeated headings get a numeric suffix; "Setup", "Setup", "Setup 2"
+        # must not produce the same key twice
+        key, n = base_key, 1
+        while key in seen_keys:
+            n += 1
+            key = f"{base_key}_{n}"
+        seen_keys.add(key)
+
+        title = heading or doc_title
+        entries.append((key, {
+            "title": title,
+            "source": rel_path,
+            "passages": [_index_passage(title, chunk)
+                         for chunk in chunk_text(body, chunk_words, chunk_overlap)],
+        }))
+    return entries
+
+
+def _process_to_shard(job: Tuple[str, str, str, int, int]) -> Tuple[str, List[str]]:
+    """Worker entry point: process a file and write its entries to a shard
+
+    Shards are JSON Lines files named after the path and content hash, so unchanged
+    files are never re-processed and the parent never holds every entry.
+    """
+    path, rel_path, shard_path, chunk_words, chunk_overlap = job
+    keys = []
+    tmp_path = shard_path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as out:
+        for key, entry in process_file(path, rel_path, chunk_words, chunk_overlap):
+            out.write(json.dumps([key, entry], ensure_ascii=False) + "\n")
+            keys.append(key)
+    os.replace(tmp_path, shard_path)
+    return rel_path, keys
+
+
+def discover_files(inputs: Iterable[str]) -> List[Tuple[Path, str]]:
+    """Expand input paths into (absolute path, relative name) pairs for Markdown files
+
+    Names inside a directory are prefixed with the directory's own name, so
+    d1/x.md and d2/x.md stay distinct. Two different files that still map to
+    the same name raise ValueError rather than one silently replacing the other.
+    """
+    found = {}
+    names = {}
+    for raw in inputs:
+        root = Path(raw)
+        if root.is_dir():
+            prefix = root.resolve().name
+            candidates = [(path, f"{prefix}/{path.relative_to(root).as_posix()}")
+                          for path in sorted(root.rglob('*'))
+                          if path.is_file() and path.suffix.lower() in ('.md', '.markdown')]
+        elif root.is_file():
+            candidates = [(root, root.name)]
+        else:
+            print(f"⚠️  Skipping missing path: {raw}", file=sys.stderr)
+            continue
+
+        for path, rel_path in candidates:
+            path = path.resolve()
+            if path in found:
+                continue
+            if rel_path in names:
+                raise ValueError(f"{names[rel_path]} and {path} both map to {rel_path}; "
+                                 f"ingest them from differently named directories")
+            found[path] = rel_path
+            names[rel_path] = path
+    return sorted(found.items(), key=lambda item: item[1])
+
+
+def _load_manifest(cache_dir: Path) -> Dict[str, Any]:
+    try:
+        with open(cache_dir / MANIFEST_NAME, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _iter_shard(shard_path: Path) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    with open(shard_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                key, entry = json.loads(line)
+                yield key, entry
+
+
+def write_knowledge_base(shards: List[Path], output: Path) -> int:
+    """Stream shard entries into a single knowledge base JSON object
+
+    Entries are written one at a time, so memory use is bounded by the
+    largest entry rather than the whole knowledge base. A key appearing
+    twice raises ValueError instead of dropping an entry.
+    """
+    count = 0
+    seen = set()
+    tmp_path = output.with_name(output.name + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as out:
+        out.write("{\n")
+        for shard in shards:
+            for key, entry in _iter_shard(shard):
+                if key in seen:
+                    out.close()
+                    os.remove(tmp_path)
+                    raise ValueError(f"Duplicate knowledge base key {key} in {shard}")
+                seen.add(key)
+                if count:
+                    out.write(",\n")
+                out.write(f"  {json.dumps(key)}: {json.dumps(entry, ensure_ascii=False)}")
+                count += 1
+        out.write("\n}\n")
+    os.replace(tmp_path, output)
+    return count
+
+
+def ingest(inputs: Iterable[str], output: str = DEFAULT_OUTPUT,
+           cache_dir: str = DEFAULT_CACHE_DIR, workers: Optional[int] = None,
+           force: bool = False) -> Dict[str, int]:
+    """Ingest Markdown files into a knowledge base file
+
+    Returns counts of processed, reused and written entries.
+    """
+    # Each output gets its own shard directory and manifest, so runs that
+    # build different knowledge bases from the same cache root never
+    # delete each other's shards
+    output_id = hashlib.sha256(os.path.abspath(output).encode('utf-8')).hexdigest()[:16]
+    cache = Path(cache_dir) / output_id
+    cache.mkdir(parents=True, exist_ok=True)
+    manifest = {} if force else _load_manifest(cache)
+
+    files = discover_files(inputs)
+    jobs = []
+    shards = []
+    new_manifest = {}
+    reused = 0
+
+    signature = pipeline_signature()
+    for path, rel_path in files:
+        digest = file_hash(path)
+        # Keys and titles derive from the file name, so a renamed file needs a new
+        # shard; changed chunking settings or parser versions need one too
+        shard_id = hashlib.sha256(f"{signature}\0{rel_path}\0{digest}".encode('utf-8')).hexdigest()
+        shard = cache / f"{shard_id}.jsonl"
+        shards.append(shard)
+        previous = manifest.get(rel_path)
+        if (previous and previous.get("hash") == digest
+                and previous.get("pipeline") == signature and shard.exists()):
+            new_manifest[rel_path] = previous
+            reused += 1
+        else:
+            new_manifest[rel_path] = {"hash": digest, "pipeline": signature, "keys": []}
+            jobs.append((str(path), rel_path, str(shard), CHUNK_WORDS, CHUNK_OVERLAP))
+
+    if jobs:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            for rel_path, keys in pool.map(_process_to_shard, jobs):
+                new_manifest[rel_path]["keys"] = keys
+
+    # Different files can still slugify to the same key (a-b.md and a_b.md)
+    owners = {}
+    for rel_path, info in new_manifest.items():
+        for key in info["keys"]:
+            if key in owners:
+                raise ValueError(f"{owners[key]} and {rel_path} both produce the key {key}; "
+                                 f"rename one of them")
+            owners[key] = rel_path
+
+    # Drop shards that no longer belong to any input file
+    live = {shard.name for shard in shards}
+    for stale in cache.glob('*.jsonl'):
+        if stale.name not in live:
+            stale.unlink()
+
+    with open(cache / MANIFEST_NAME, 'w', encoding='utf-8') as f:
+        json.dump(new_manifest, f, indent=2)
+
+    written = write_knowledge_base(shards, Path(output))
+    return {"processed": len(jobs), "reused": reused, "entries": written}
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Ingest Markdown docs into the MCP knowledge base")
+    parser.add_argument("inputs", nargs="+", help="Markdown files or directories to ingest")
+    parser.add_argument("--output", default=os.getenv("INGESTED_KB_FILE", DEFAULT_OUTPUT),
+                        help=f"Output knowledge base file (default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help=f"Root directory for per-output shards and hash manifests (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: number of CPU cores)")
+    parser.add_argument("--force", action="store_true", help="Re-process every file, ignoring the cache")
+    args = parser.parse_args()
+
+    try:
+        stats = ingest(args.inputs, args.output, args.cache_dir, args.workers, args.force)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"✅ Processed {stats['processed']} file(s), reused {stats['reused']} unchanged")
+    print(f"📚 Wrote {stats['entries']} entries to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
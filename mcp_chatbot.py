@@ -1,21 +1,62 @@
 import json
 import os
+from collections import Counter
 from typing import List, Dict, Any
 from openai import OpenAI
 from dotenv import load_dotenv
 import streamlit as st
 import re
+import threading
 import numpy as np
+from rate_limiter import get_admission_controller, PRIORITY_NORMAL, REJECT_USER_QUOTA
+from query_normalizer import QueryNormalizer, load_synonyms, stem
 
 # Load environment variables
 load_dotenv()
 
+# Structured fields searched and included in the prompt context
+STRUCTURED_FIELDS = ['key_points', 'components', 'capabilities', 'patterns',
+                     'practices', 'use_cases', 'issues', 'steps', 'details', 'tools']
+
+# Loaded knowledge and search indexes shared by every session in the process,
+# keyed by source file paths and rebuilt when any of their mtimes change
+_index_cache: Dict[tuple, tuple] = {}
+_index_cache_lock = threading.Lock()
+
+def _file_mtime(path: str):
+    """Modification time of a file, or None if it does not exist"""
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
 class MCPKnowledgeBase:
     """Knowledge base for MCP-related information"""
     
-    def __init__(self, knowledge_file: str = "knowledge_base.json"):
+    def __init__(self, knowledge_file: str = "knowledge_base.json", ingested_file: str = None,
+                 synonyms_file: str = None):
         self.knowledge_file = knowledge_file
-        self.knowledge_data = self._load_knowledge()
+        self.ingested_file = ingested_file or os.getenv("INGESTED_KB_FILE", "ingested_kb.json")
+        self.synonyms_file = synonyms_file or os.getenv("SYNONYMS_FILE", "synonyms.json")
+        self._load_shared_index()
+    
+    def _load_shared_index(self):
+        """Reuse this process's knowledge data and indexes, building them on first use
+
+        Every Streamlit session creates its own MCPKnowledgeBase; the
+        spelling tables alone are too costly to rebuild per session.
+        """
+        paths = tuple(os.path.abspath(p) for p in (self.knowledge_file, self.ingested_file, self.synonyms_file))
+        signature = tuple(_file_mtime(p) for p in paths)
+        with _index_cache_lock:
+            cached = _index_cache.get(paths)
+            if cached is not None and cached[0] == signature:
+                self.knowledge_data, self.search_index, self.normalizer = cached[1]
+                return
+            self.knowledge_data = self._load_knowledge()
+            self.knowledge_data.update(self._load_ingested())
+            self._build_index()
+            _index_cache[paths] = (signature, (self.knowledge_data, self.search_index, self.normalizer))
     
     def _load_knowledge(self) -> Dict[str, Any]:
         """Load knowledge base from JSON file"""
@@ -26,49 +67,104 @@ class MCPKnowledgeBase:
             st.error(f"Knowledge base file {self.knowledge_file} not found!")
             return {}
     
+    def _load_ingested(self) -> Dict[str, Any]:
+        """Load entries generated by kb_ingest.py, if present"""
+        if not os.path.exists(self.ingested_file):
+            return {}
+        try:
+            with open(self.ingested_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except json.JSONDecodeError:
+            st.warning(f"Ingested knowledge base {self.ingested_file} is not valid JSON, skipping")
+            return {}
+        # Hand-edited entries take precedence over ingested ones with the same key
+        return {key: item for key, item in data.items() if key not in self.knowledge_data}
+    
+    def _load_synonyms(self):
+        """Load the synonym map, falling back to none if the file is malformed"""
+        try:
+            return load_synonyms(self.synonyms_file)
+        except ValueError as e:
+            st.warning(f"Synonyms file {self.synonyms_file} is invalid, skipping: {e}")
+            return [], {}
+    
+    def _item_search_text(self, item: Dict[str, Any], content: str) -> str:
+        """Combine title, content and structured fields into one searchable string"""
+        search_text = f"{item.get('title', '')} {content}"
+        
+        # Add structured content
+        for field in STRUCTURED_FIELDS:
+            if field in item:
+                if isinstance(item[field], list):
+                    search_text += " " + " ".join(str(x) for x in item[field])
+                else:
+                    search_text += " " + str(item[field])
+        return search_text
+    
+    def _build_index(self):
+        """Precompute search text and stems per item or passage, and the query normalizer tables
+
+        Ingested entries are split into passages; each passage is indexed on
+        its own so a match returns only that passage, not the whole section.
+        Passages from kb_ingest.py carry their tokens and stems already.
+        """
+        self.search_index = []
+        vocabulary = Counter()
+        for key, item in self.knowledge_data.items():
+            for passage in item.get('passages') or [item.get('content', '')]:
+                if isinstance(passage, dict):
+                    # Tokenized and stemmed by kb_ingest.py's worker processes
+                    content = passage['text']
+                    search_text_lower = self._item_search_text(item, content).lower()
+                    search_stems = set(passage['stems'])
+                    vocabulary.update(passage['tokens'])
+                else:
+                    content = passage
+                    search_text_lower = self._item_search_text(item, content).lower()
+                    words = re.findall(r'\w+', search_text_lower)
+                    search_stems = {stem(w) for w in words}
+                    vocabulary.update(words)
+                self.search_index.append((key, item, content, search_text_lower, search_stems))
+        synonym_groups, expansions = self._load_synonyms()
+        self.normalizer = QueryNormalizer(vocabulary, synonym_groups, expansions)
+    
     def search_relevant_content(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
-        """Search for relevant content based on query using keyword matching"""
+        """Search for relevant content based on query using keyword matching
+
+        The query is spell-corrected against the knowledge base vocabulary,
+        stemmed and expanded with synonyms before matching. For entries with
+        passages, the best-matching passage is returned as the content.
+        """
         if not self.knowledge_data:
             return []
         
         query_lower = query.lower()
-        query_words = set(re.findall(r'\w+', query_lower))
+        _, query_terms = self.normalizer.normalize(query)
         
-        scored_items = []
+        best_by_key = {}
         
-        for key, item in self.knowledge_data.items():
-            # Combine all text content for searching
-            search_text = f"{item.get('title', '')} {item.get('content', '')}"
-            
-            # Add structured content
-            for field in ['key_points', 'components', 'capabilities', 'patterns', 
-                         'practices', 'use_cases', 'issues', 'steps', 'details', 'tools']:
-                if field in item:
-                    if isinstance(item[field], list):
-                        search_text += " " + " ".join(str(x) for x in item[field])
-                    else:
-                        search_text += " " + str(item[field])
-            
-            search_text_lower = search_text.lower()
-            search_words = set(re.findall(r'\w+', search_text_lower))
-            
+        for key, item, content, search_text_lower, search_stems in self.search_index:
             # Calculate relevance score
-            # Exact phrase match gets highest score
+            # Exact phrase match gets highest score; only the query as typed
+            # counts, so a spelling correction never earns the boost
             if query_lower in search_text_lower:
                 score = 10.0
             else:
-                # Word overlap score
-                common_words = query_words.intersection(search_words)
-                if len(query_words) > 0:
-                    score = len(common_words) / len(query_words)
+                # Term overlap score; a term matches if any of its stems or synonyms appear
+                if len(query_terms) > 0:
+                    matched = sum(1 for terms in query_terms if not terms.isdisjoint(search_stems))
+                    score = matched / len(query_terms)
                 else:
                     score = 0
             
-            if score > 0:
-                result_item = item.copy()
+            if score > 0 and (key not in best_by_key or score > best_by_key[key]['similarity_score']):
+                result_item = {k: v for k, v in item.items() if k != 'passages'}
+                result_item['content'] = content
                 result_item['similarity_score'] = score
                 result_item['key'] = key
-                scored_items.append(result_item)
+                best_by_key[key] = result_item
+        
+        scored_items = list(best_by_key.values())
         
         # Sort by score and return top_k
         scored_items.sort(key=lambda x: x['similarity_score'], reverse=True)
@@ -83,6 +179,7 @@ class MCPChatbot:
         self.max_tokens = int(os.getenv("MAX_TOKENS", "1000"))
         self.temperature = float(os.getenv("TEMPERATURE", "0.7"))
         self.knowledge_base = MCPKnowledgeBase()
+        self.admission = get_admission_controller()
         
         # System prompt for MCP expertise
         self.system_prompt = """You are an expert on the Model Context Protocol (MCP). You help developers understand MCP concepts, implementation, best practices, and troubleshooting. 
@@ -96,8 +193,14 @@ Your responses should be:
 
 When answering questions, use the provided context from the knowledge base to ensure accuracy and completeness."""
     
-    def get_response(self, user_question: str, conversation_history: List[Dict[str, str]] = None) -> str:
-        """Generate response using OpenAI API with MCP knowledge"""
+    def get_response(self, user_question: str, conversation_history: List[Dict[str, str]] = None,
+                     user_id: str = "anonymous", priority: int = PRIORITY_NORMAL) -> str:
+        """Generate response using OpenAI API with MCP knowledge
+
+        Requests go through the shared admission controller; if the user is
+        over quota or the queue sheds the request, a knowledge-base-only
+        answer is returned instead of calling OpenAI.
+        """
         
         # Search for relevant content in knowledge base
         relevant_content = self.knowledge_base.search_relevant_content(user_question, top_k=3)
@@ -116,6 +219,12 @@ When answering questions, use the provided context from the knowledge base to en
         context_message = f"Context from MCP knowledge base:\n{context}\n\nUser question: {user_question}"
         messages.append({"role": "user", "content": context_message})
         
+        # Rough prompt size (~4 characters per token) plus the completion budget
+        estimated_tokens = sum(len(m["content"]) for m in messages) // 4 + self.max_tokens
+        admitted, reason = self.admission.acquire(user_id, estimated_tokens, priority)
+        if not admitted:
+            return self._kb_only_response(relevant_content, reason)
+        
         try:
             response = self.client.chat.completions.create(
                 model=self.model,
@@ -124,11 +233,31 @@ When answering questions, use the provided context from the knowledge base to en
                 temperature=self.temperature
             )
             
+            if response.usage is not None:
+                self.admission.reconcile(estimated_tokens, response.usage.total_tokens)
+            
             return response.choices[0].message.content
         
         except Exception as e:
             return f"Error generating response: {str(e)}"
     
+    def _kb_only_response(self, relevant_content: List[Dict[str, Any]], reason: str) -> str:
+        """Answer from the knowledge base alone when a request is not admitted"""
+        if reason == REJECT_USER_QUOTA:
+            notice = "⏳ You're sending questions faster than your quota allows."
+        else:
+            notice = "⏳ The assistant is under heavy load right now."
+        
+        if not relevant_content:
+            return f"{notice} Please try again in a moment."
+        
+        return (f"{notice} Here is the most relevant information from the MCP knowledge base:\n\n"
+                + self._format_context(relevant_content))
+    
+    def get_metrics(self) -> Dict[str, int]:
+        """Admission queue depth and rejection counters"""
+        return self.admission.get_metrics()
+    
     def _format_context(self, relevant_content: List[Dict[str, Any]]) -> str:
         """Format relevant content as context for the AI"""
         if not relevant_content:
@@ -140,8 +269,7 @@ When answering questions, use the provided context from the knowledge base to en
             context_part += f"{item.get('content', '')}\n"
             
             # Add structured information
-            for field in ['key_points', 'components', 'capabilities', 'patterns', 
-                         'practices', 'use_cases', 'issues', 'steps', 'details', 'tools']:
+            for field in STRUCTURED_FIELDS:
                 if field in item and item[field]:
                     context_part += f"\n{field.replace('_', ' ').title()}:\n"
                     if isinstance(item[field], list):
@@ -0,0 +1,234 @@
+"""
+Query normalization for knowledge base retrieval
+
+Corrects spelling against the knowledge base vocabulary with symmetric-delete
+lookup, reduces words to stems, and expands them with a configurable synonym
+map. All lookup tables are built once from the knowledge base so normalizing
+a query is a handful of dictionary lookups.
+"""
+
+import json
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+WORD_RE = re.compile(r'\w+')
+
+# Question and function words: never spell-corrected and not used for matching
+STOP_WORDS = frozenset("""
+a an and are as at be by can do does for from how i in is it my of on or
+should the to what when where which who why with you your
+""".split())
+
+# Suffixes stripped by stem(), longest first
+_SUFFIXES = (
+    'ational', 'ization', 'fulness', 'iveness', 'ations', 'ation', 'ement',
+    'ments', 'ment', 'ness', 'able', 'ible', 'ings', 'ing', 'ies', 'ied',
+    'ers', 'er', 'ed', 'ly', 'es', 's',
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, matching MCPKnowledgeBase's search tokenizer"""
+    return WORD_RE.findall(text.lower())
+
+
+@lru_cache(maxsize=65536)
+def stem(word: str) -> str:
+    """Light suffix-stripping stemmer
+
+    Strips one common English suffix while keeping a stem of at least three
+    characters, so "servers", "serving" and "server" all reduce to "serv".
+    Not a full Porter stemmer; it only needs to be consistent between the
+    index and the query.
+    """
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    base = word
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+            if suffix == 's' and word.endswith('ss'):
+                # "class", "process": not a plural
+                break
+            base = word[:-len(suffix)]
+            if suffix in ('ies', 'ied'):
+                base += 'y'
+            elif base[-1] == base[-2] and base[-1] not in 'lsz':
+                # "debugging" -> "debug", "mapped" -> "map"
+                base = base[:-1]
+            break
+    # "service" and "services" should share a stem
+    if base.endswith('e') and len(base) > 4:
+        base = base[:-1]
+    return base
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    """All strings reachable from `word` by deleting up to `max_distance` characters"""
+    results = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for item in frontier:
+            if len(item) <= 1:
+                continue
+            for i in range(len(item)):
+                next_frontier.add(item[:i] + item[i + 1:])
+        results |= next_frontier
+        frontier = next_frontier
+    return results
+
+
+def _edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Damerau-Levenshtein (optimal string alignment) distance, capped at max_distance + 1"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+def load_synonyms(path: str) -> Tuple[List[List[str]], Dict[str, List[str]]]:
+    """Load synonym groups and one-way expansions from a JSON file
+
+    The file has two optional sections:
+
+        {"equivalents": [["authentication", "auth"]],
+         "expansions": {"stdio": ["transport"]}}
+
+    Each equivalents group is a set of interchangeable words and matches in
+    both directions. An expansion lets a narrower word also match broader
+    terms, but not the reverse: "stdio" matches "transport", while
+    "transport" does not match "stdio". Multi-word terms are split into
+    their words. A missing file yields no synonyms; a malformed one raises
+    ValueError (json.JSONDecodeError is a subclass).
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return [], {}
+    if not isinstance(data, dict):
+        raise ValueError(f"{path} must contain a JSON object")
+    equivalents = data.get("equivalents", [])
+    expansions = data.get("expansions", {})
+    if not isinstance(equivalents, list) or not all(isinstance(g, list) for g in equivalents):
+        raise ValueError(f"{path}: \"equivalents\" must be a list of word lists")
+    if not isinstance(expansions, dict) or not all(isinstance(v, list) for v in expansions.values()):
+        raise ValueError(f"{path}: \"expansions\" must map words to lists of words")
+    return equivalents, expansions
+
+
+class QueryNormalizer:
+    """Spelling correction, stemming and synonym expansion against a fixed vocabulary"""
+
+    def __init__(self, vocabulary: Counter, synonym_groups: Iterable[Iterable[str]] = (),
+                 expansions: Dict[str, Iterable[str]] = None,
+                 max_edit_distance: int = 2, min_correct_length: int = 4):
+        self.max_edit_distance = max_edit_distance
+        self.min_correct_length = min_correct_length
+
+        # Synonym terms count as known words so they are never "corrected" away
+        self.vocabulary = Counter(vocabulary)
+        synonym_stems: Dict[str, Set[str]] = {}
+        for group in synonym_groups:
+            words = [w for term in group for w in tokenize(term)]
+            stems = {stem(w) for w in words}
+            for word in words:
+                self.vocabulary.setdefault(word, 1)
+            for s in stems:
+                synonym_stems.setdefault(s, set()).update(stems)
+        for narrow, broader in (expansions or {}).items():
+            words = tokenize(narrow) + [w for term in broader for w in tokenize(term)]
+            for word in words:
+                self.vocabulary.setdefault(word, 1)
+            for s in {stem(w) for w in tokenize(narrow)}:
+                group = synonym_stems.setdefault(s, {s})
+                group.update(stem(w) for term in broader for w in tokenize(term))
+        self.synonyms: Dict[str, FrozenSet[str]] = {s: frozenset(group) for s, group in synonym_stems.items()}
+
+        # Symmetric-delete index: delete variant -> vocabulary words producing it
+        self.delete_index: Dict[str, List[str]] = {}
+        for word in self.vocabulary:
+            if len(word) < self.min_correct_length or not word.isalpha():
+                continue
+            for variant in _deletes(word, max_edit_distance):
+                self.delete_index.setdefault(variant, []).append(word)
+
+        self._corrections: Dict[str, str] = {}
+        self.max_cached_corrections = 10000
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[str], synonyms_file: str = None, **kwargs) -> "QueryNormalizer":
+        """Build a normalizer whose vocabulary is every word in `texts`"""
+        vocabulary = Counter()
+        for text in texts:
+            vocabulary.update(tokenize(text))
+        return cls.from_vocabulary(vocabulary, synonyms_file, **kwargs)
+
+    @classmethod
+    def from_vocabulary(cls, vocabulary: Counter, synonyms_file: str = None, **kwargs) -> "QueryNormalizer":
+        """Build a normalizer from precomputed word counts and a synonyms file"""
+        synonyms_file = synonyms_file or os.getenv("SYNONYMS_FILE", "synonyms.json")
+        synonym_groups, expansions = load_synonyms(synonyms_file)
+        return cls(vocabulary, synonym_groups, expansions, **kwargs)
+
+    def allowed_distance(self, word: str) -> int:
+        """Edit distance allowed when correcting `word`
+
+        Short words are left alone: "rust", "java" and "node" are real words
+        that are one or two edits away from unrelated KB terms.
+        """
+        if len(word) <= 4:
+            return 0
+        if len(word) <= 8:
+            return min(1, self.max_edit_distance)
+        return self.max_edit_distance
+
+    def correct(self, word: str) -> str:
+        """Closest vocabulary word within the edit distance, or `word` itself"""
+        if (word in self.vocabulary or word in STOP_WORDS or not word.isalpha()
+                or len(word) < self.min_correct_length or self.allowed_distance(word) == 0):
+            return word
+        cached = self._corrections.get(word)
+        if cached is not None:
+            return cached
+
+        max_distance = self.allowed_distance(word)
+        best, best_key = word, None
+        for variant in _deletes(word, max_distance):
+            for candidate in self.delete_index.get(variant, ()):
+                distance = _edit_distance(word, candidate, max_distance)
+                if distance > max_distance:
+                    continue
+                key = (distance, -self.vocabulary[candidate], candidate)
+                if best_key is None or key < best_key:
+                    best, best_key = candidate, key
+
+        if len(self._corrections) >= self.max_cached_corrections:
+            self._corrections.clear()
+        self._corrections[word] = best
+        return best
+
+    def terms(self, word: str) -> FrozenSet[str]:
+        """Stems that count as a match for an already-corrected word"""
+        s = stem(word)
+        return self.synonyms.get(s, frozenset((s,)))
+
+    def normalize(self, query: str) -> Tuple[List[str], List[FrozenSet[str]]]:
+        """Return the corrected query words and one set of matching stems per content word"""
+        words = [self.correct(w) for w in tokenize(query)]
+        return words, [self.terms(w) for w in dict.fromkeys(words) if w not in STOP_WORDS]
@@ -0,0 +1,208 @@
+"""
+Rate limiting and admission control for OpenAI requests
+
+Every Streamlit session shares one AdmissionController per process. Each
+request must pass a per-user token bucket (requests per minute) and then wait
+in a priority queue for the global buckets sized to the upstream OpenAI RPM
+and TPM limits. Requests that exceed their user quota, find the queue full or
+wait longer than the bounded wait are shed so the caller can fall back to a
+knowledge-base-only answer; shed requests do not count against the user quota.
+"""
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Priorities: lower values are admitted first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+# Rejection reasons reported by AdmissionController.acquire
+REJECT_USER_QUOTA = "user_quota"
+REJECT_QUEUE_FULL = "queue_full"
+REJECT_TIMEOUT = "timeout"
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate` tokens per second"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        """Take `amount` tokens if available, without blocking"""
+        with self._lock:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return True
+            return False
+
+    def wait_time(self, amount: float = 1.0) -> float:
+        """Seconds until `amount` tokens will be available"""
+        with self._lock:
+            self._refill()
+            if self.tokens >= amount:
+                return 0.0
+            if self.rate <= 0:
+                return float('inf')
+            return (min(amount, self.capacity) - self.tokens) / self.rate
+
+    def refund(self, amount: float = 1.0):
+        """Return tokens taken by a request that was not carried out"""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    def debit(self, amount: float):
+        """Charge tokens after the fact
+
+        The balance may go negative; a negative amount credits tokens back
+        but never beyond capacity.
+        """
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class AdmissionController:
+    """Per-user quotas plus a bounded priority queue in front of global limits"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float,
+                 user_requests_per_minute: float, user_burst: float,
+                 max_queue: int, max_wait: float):
+        self.request_bucket = TokenBucket(requests_per_minute / 60.0, max(requests_per_minute / 60.0, 1.0))
+        self.token_bucket = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute)
+        self.user_rate = user_requests_per_minute / 60.0
+        self.user_burst = user_burst
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+
+        self._user_buckets: Dict[str, TokenBucket] = {}
+        self.eviction_interval = 60.0
+        self._last_eviction = time.monotonic()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._metrics = {
+            "admitted": 0,
+            "rejected_user_quota": 0,
+            "rejected_queue_full": 0,
+            "rejected_timeout": 0,
+            "max_queue_depth": 0,
+        }
+
+    def _evict_idle_buckets(self):
+        """Drop per-user buckets that have refilled completely
+
+        A bucket untouched for capacity/rate seconds is full again, so
+        dropping it and creating a fresh one later behaves the same. This
+        keeps one-off Streamlit sessions from accumulating forever.
+        """
+        now = time.monotonic()
+        if now - self._last_eviction < self.eviction_interval:
+            return
+        self._last_eviction = now
+        idle_after = self.user_burst / self.user_rate if self.user_rate > 0 else float('inf')
+        for user_id in [u for u, b in self._user_buckets.items() if now - b.updated >= idle_after]:
+            del self._user_buckets[user_id]
+
+    def _user_bucket(self, user_id: str) -> TokenBucket:
+        bucket = self._user_buckets.get(user_id)
+        if bucket is None:
+            bucket = self._user_buckets[user_id] = TokenBucket(self.user_rate, self.user_burst)
+        return bucket
+
+    def acquire(self, user_id: str, estimated_tokens: int,
+                priority: int = PRIORITY_NORMAL) -> Tuple[bool, Optional[str]]:
+        """Wait for admission; returns (admitted, rejection reason)"""
+        deadline = time.monotonic() + self.max_wait
+        estimated_tokens = min(estimated_tokens, self.token_bucket.capacity)
+
+        with self._cond:
+            self._evict_idle_buckets()
+            user_bucket = self._user_bucket(user_id)
+            if not user_bucket.try_acquire():
+                self._metrics["rejected_user_quota"] += 1
+                return False, REJECT_USER_QUOTA
+            if len(self._queue) >= self.max_queue:
+                user_bucket.refund()
+                self._metrics["rejected_queue_full"] += 1
+                return False, REJECT_QUEUE_FULL
+
+            entry = (priority, next(self._sequence))
+            heapq.heappush(self._queue, entry)
+            self._metrics["max_queue_depth"] = max(self._metrics["max_queue_depth"], len(self._queue))
+
+            try:
+                while True:
+                    if self._queue[0] == entry:
+                        wait = max(self.request_bucket.wait_time(1),
+                                   self.token_bucket.wait_time(estimated_tokens))
+                        if wait == 0 and self.request_bucket.try_acquire(1):
+                            self.token_bucket.debit(estimated_tokens)
+                            self._metrics["admitted"] += 1
+                            return True, None
+                    else:
+                        wait = self.max_wait
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        user_bucket.refund()
+                        self._metrics["rejected_timeout"] += 1
+                        return False, REJECT_TIMEOUT
+                    self._cond.wait(min(max(wait, 0.01), remaining))
+            finally:
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._cond.notify_all()
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: int):
+        """Correct the global token bucket once real usage is known
+
+        The estimate includes the whole completion budget, so this usually
+        returns tokens to the bucket.
+        """
+        self.token_bucket.debit(actual_tokens - estimated_tokens)
+
+    def get_metrics(self) -> Dict[str, int]:
+        """Snapshot of queue depth and admission counters"""
+        with self._cond:
+            metrics = dict(self._metrics)
+            metrics["queue_depth"] = len(self._queue)
+        metrics["rejected_total"] = (metrics["rejected_user_quota"] + metrics["rejected_queue_full"]
+                                     + metrics["rejected_timeout"])
+        return metrics
+
+
+_controller: Optional[AdmissionController] = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> AdmissionController:
+    """Return the process-wide controller, configured from environment variables"""
+    global _controller
+    with _controller_lock:
+        if _controller is None:
+            _controller = AdmissionController(
+                requests_per_minute=float(os.getenv("OPENAI_RPM", "3500")),
+                tokens_per_minute=float(os.getenv("OPENAI_TPM", "90000")),
+                user_requests_per_minute=float(os.getenv("USER_RPM", "10")),
+                user_burst=float(os.getenv("USER_BURST", "3")),
+                max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "32")),
+                max_wait=float(os.getenv("ADMISSION_MAX_WAIT", "10")),
+            )
+        return _controller
@@ -0,0 +1,136 @@
+import json
+
+import pytest
+
+import kb_ingest
+from kb_ingest import chunk_text, discover_files, ingest
+
+
+def write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+
+
+def run(tmp_path, *inputs, **kwargs):
+    output = tmp_path / "kb.json"
+    stats = ingest([str(p) for p in inputs], str(output), str(tmp_path / "cache"), workers=2, **kwargs)
+    with open(output, 'r', encoding='utf-8') as f:
+        return stats, json.load(f)
+
+
+def test_same_file_name_in_two_roots_is_kept(tmp_path):
+    write(tmp_path / "d1" / "x.md", "# One\nfirst doc")
+    write(tmp_path / "d2" / "x.md", "# Two\nsecond doc")
+
+    stats, kb = run(tmp_path, tmp_path / "d1", tmp_path / "d2")
+
+    assert stats["processed"] == 2
+    assert stats["entries"] == 2
+    assert {item["source"] for item in kb.values()} == {"d1/x.md", "d2/x.md"}
+
+
+def test_colliding_names_fail_loudly(tmp_path):
+    write(tmp_path / "a" / "docs" / "x.md", "# One\nfirst")
+    write(tmp_path / "b" / "docs" / "x.md", "# Two\nsecond")
+
+    with pytest.raises(ValueError):
+        discover_files([str(tmp_path / "a" / "docs"), str(tmp_path / "b" / "docs")])
+
+
+def test_only_changed_files_are_reprocessed(tmp_path):
+    docs = tmp_path / "docs"
+    write(docs / "a.md", "# Alpha\nalpha text")
+    write(docs / "b.md", "# Beta\nbeta text")
+
+    stats, _ = run(tmp_path, docs)
+    assert (stats["processed"], stats["reused"]) == (2, 0)
+
+    stats, _ = run(tmp_path, docs)
+    assert (stats["processed"], stats["reused"]) == (0, 2)
+
+    write(docs / "b.md", "# Beta\nbeta text, revised")
+    stats, kb = run(tmp_path, docs)
+    assert (stats["processed"], stats["reused"]) == (1, 1)
+    assert [p["text"] for p in kb["docs_b__beta"]["passages"]] == ["beta text, revised"]
+
+
+def test_changed_chunking_settings_rebuild_shards(tmp_path, monkeypatch):
+    docs = tmp_path / "docs"
+    write(docs / "a.md", "# Alpha\n" + " ".join(f"word{i}" for i in range(30)))
+
+    stats, kb = run(tmp_path, docs)
+    assert stats["processed"] == 1
+    assert len(kb["docs_a__alpha"]["passages"]) == 1
+
+    monkeypatch.setattr(kb_ingest, "CHUNK_WORDS", 10)
+    monkeypatch.setattr(kb_ingest, "CHUNK_OVERLAP", 2)
+    stats, kb = run(tmp_path, docs)
+    assert (stats["processed"], stats["reused"]) == (1, 0)
+    assert len(kb["docs_a__alpha"]["passages"]) > 1
+
+
+def test_repeated_headings_get_distinct_keys(tmp_path):
+    docs = tmp_path / "docs"
+    write(docs / "a.md", "# Setup\none\n# Setup\ntwo\n# Setup 2\nthree")
+
+    stats, kb = run(tmp_path, docs)
+
+    assert stats["entries"] == 3
+    assert sorted(kb) == ["docs_a__setup", "docs_a__setup_2", "docs_a__setup_2_2"]
+    assert [[p["text"] for p in kb[k]["passages"]] for k in sorted(kb)] == [["one"], ["two"], ["three"]]
+
+
+def test_files_with_colliding_keys_fail_loudly(tmp_path):
+    docs = tmp_path / "docs"
+    write(docs / "a-b.md", "# Intro\nfirst")
+    write(docs / "a_b.md", "# Intro\nsecond")
+
+    with pytest.raises(ValueError, match="docs_a_b__intro"):
+        run(tmp_path, docs)
+
+
+def test_chunks_keep_line_breaks_and_balanced_fences():
+    code = "\n".join(f"    line_{i} = {i}" for i in range(30))
+    body = f"Intro paragraph here.\n\n```python\ndef f():\n{code}\n```\n\nClosing words."
+
+    chunks = chunk_text(body, size=40, overlap=5)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        fences = [line for line in chunk.splitlines() if line.startswith("```")]
+        assert len(fences) % 2 == 0
+    assert "    line_0 = 0\n    line_1 = 1" in "\n".join(chunks)
+    assert chunks[0].startswith("Intro paragraph here.")
+    assert chunks[-1].endswith("Closing words.")
+
+
+def test_short_sections_are_one_chunk():
+    body = "first line\n  indented line"
+    assert chunk_text(body) == [body]
+
+
+def test_passages_carry_precomputed_terms(tmp_path):
+    docs = tmp_path / "docs"
+    write(docs / "a.md", "# Servers\nRunning the servers")
+
+    _, kb = run(tmp_path, docs)
+
+    passage = kb["docs_a__servers"]["passages"][0]
+    assert passage["text"] == "Running the servers"
+    assert passage["tokens"] == {"servers": 2, "running": 1, "the": 1}
+    assert "serv" in passage["stems"] and "run" in passage["stems"]
+
+
+def test_outputs_sharing_a_cache_keep_their_shards(tmp_path):
+    write(tmp_path / "docs" / "a.md", "# Alpha\nalpha text")
+    write(tmp_path / "other" / "b.md", "# Beta\nbeta text")
+    cache = str(tmp_path / "cache")
+
+    def build(source, output):
+        return ingest([str(tmp_path / source)], str(tmp_path / output), cache, workers=1)
+
+    build("docs", "a.json")
+    build("other", "b.json")
+
+    assert build("docs", "a.json")["reused"] == 1
+    assert build("other", "b.json")["reused"] == 1
@@ -0,0 +1,92 @@
+import json
+import os
+
+import pytest
+
+from mcp_chatbot import MCPKnowledgeBase
+
+
+@pytest.fixture
+def kb_files(tmp_path):
+    knowledge = tmp_path / "knowledge_base.json"
+    knowledge.write_text(json.dumps({
+        "overview": {"title": "Overview", "content": "Hand written overview of servers"},
+    }), encoding='utf-8')
+    ingested = tmp_path / "ingested_kb.json"
+    ingested.write_text(json.dumps({
+        "overview": {"title": "Ingested overview", "source": "docs/a.md", "passages": ["replaced"]},
+        "docs_a__guide": {
+            "title": "Guide",
+            "source": "docs/a.md",
+            "passages": ["unrelated opening passage", "zebra stdio transport details"],
+        },
+    }), encoding='utf-8')
+    synonyms = tmp_path / "synonyms.json"
+    synonyms.write_text("{}", encoding='utf-8')
+    return str(knowledge), str(ingested), str(synonyms)
+
+
+def test_index_is_built_once_per_process(kb_files):
+    first = MCPKnowledgeBase(*kb_files)
+    second = MCPKnowledgeBase(*kb_files)
+    assert second.normalizer is first.normalizer
+    assert second.search_index is first.search_index
+
+
+def test_index_is_rebuilt_when_a_source_file_changes(kb_files):
+    first = MCPKnowledgeBase(*kb_files)
+    knowledge = kb_files[0]
+    os.utime(knowledge, ns=(0, os.stat(knowledge).st_mtime_ns + 10**9))
+    second = MCPKnowledgeBase(*kb_files)
+    assert second.normalizer is not first.normalizer
+
+
+def test_ingested_entries_are_loaded(kb_files):
+    kb = MCPKnowledgeBase(*kb_files)
+    assert "docs_a__guide" in kb.knowledge_data
+
+
+def test_hand_edited_entries_take_precedence(kb_files):
+    kb = MCPKnowledgeBase(*kb_files)
+    assert kb.knowledge_data["overview"]["title"] == "Overview"
+
+
+def test_search_returns_only_the_best_passage(kb_files):
+    kb = MCPKnowledgeBase(*kb_files)
+
+    results = kb.search_relevant_content("zebra stdio", top_k=1)
+
+    assert results[0]["key"] == "docs_a__guide"
+    assert results[0]["content"] == "zebra stdio transport details"
+    assert "passages" not in results[0]
+
+
+def test_search_uses_passages_from_kb_ingest(tmp_path, kb_files):
+    from kb_ingest import ingest
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    filler = "\n\n".join(f"Paragraph {i} about unrelated setup notes." for i in range(40))
+    (docs / "guide.md").write_text(f"# Guide\n{filler}\n\nThe zebra handshake happens last.",
+                                   encoding='utf-8')
+    ingested = tmp_path / "from_ingest.json"
+    ingest([str(docs)], str(ingested), str(tmp_path / "cache"), workers=1)
+
+    kb = MCPKnowledgeBase(kb_files[0], str(ingested), kb_files[2])
+    result = kb.search_relevant_content("zebra handshake", top_k=1)[0]
+
+    assert result["key"] == "docs_guide__guide"
+    assert result["content"].endswith("The zebra handshake happens last.")
+    assert "Paragraph 0 " not in result["content"]
+
+
+@pytest.mark.parametrize("content", ["{not json", "[]", '{"equivalents": {"auth": "authentication"}}'])
+def test_malformed_synonyms_fall_back_to_none(kb_files, content):
+    knowledge, ingested, synonyms = kb_files
+    with open(synonyms, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+    kb = MCPKnowledgeBase(knowledge, ingested, synonyms)
+
+    assert kb.normalizer.synonyms == {}
+    assert kb.search_relevant_content("zebra")
@@ -0,0 +1,109 @@
+import json
+import os
+
+import pytest
+
+from mcp_chatbot import MCPKnowledgeBase
+from query_normalizer import stem
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def knowledge_base(tmp_path_factory):
+    # The shipped knowledge base and synonyms, without any local ingested_kb.json
+    missing = tmp_path_factory.mktemp("kb") / "ingested_kb.json"
+    return MCPKnowledgeBase(os.path.join(ROOT, "knowledge_base.json"), str(missing),
+                            os.path.join(ROOT, "synonyms.json"))
+
+
+@pytest.fixture(scope="module")
+def normalizer(knowledge_base):
+    return knowledge_base.normalizer
+
+
+@pytest.mark.parametrize("typo, expected", [
+    ("sever", "server"),
+    ("conection", "connection"),
+    ("securty", "security"),
+])
+def test_corrects_typos(normalizer, typo, expected):
+    assert normalizer.correct(typo) == expected
+
+
+@pytest.mark.parametrize("word", ["rust", "java", "node"])
+def test_short_off_domain_words_are_not_corrected(normalizer, word):
+    assert normalizer.correct(word) == word
+    words, _ = normalizer.normalize(f"how do I use {word}")
+    assert word in words
+
+
+def test_stop_words_are_not_scored(normalizer):
+    words, terms = normalizer.normalize("What is MCP?")
+    assert words == ["what", "is", "mcp"]
+    assert terms == [frozenset({"mcp"})]
+
+
+def test_stem_groups_inflections():
+    assert stem("servers") == stem("serving") == stem("server")
+    assert stem("service") == stem("services")
+    assert stem("debugging") == "debug"
+    assert stem("process") == "process"
+
+
+def test_synonyms_match_abbreviations(normalizer):
+    _, terms = normalizer.normalize("auth")
+    assert stem("authentication") in terms[0]
+
+
+def test_distinct_concepts_are_not_merged(normalizer):
+    _, host_terms = normalizer.normalize("host")
+    assert stem("client") not in host_terms[0]
+
+    _, stdio_terms = normalizer.normalize("stdio")
+    assert stem("websocket") not in stdio_terms[0]
+    assert stem("sse") not in stdio_terms[0]
+
+
+def test_expansions_are_one_way(normalizer):
+    _, stdio_terms = normalizer.normalize("stdio")
+    assert stem("transport") in stdio_terms[0]
+
+    _, transport_terms = normalizer.normalize("transport")
+    assert "stdio" not in transport_terms[0]
+
+
+def test_vocabulary_is_the_indexed_text(normalizer):
+    assert "server" in normalizer.vocabulary
+    assert "key_points" not in normalizer.vocabulary
+
+
+def test_misspelled_query_retrieves_matching_entries(knowledge_base):
+    results = knowledge_base.search_relevant_content("sever")
+    assert results
+    assert all("server" in result["content"].lower() for result in results)
+
+
+def test_abbreviation_retrieves_full_term(knowledge_base):
+    keys = [result["key"] for result in knowledge_base.search_relevant_content("config")]
+    assert "troubleshooting" in keys
+
+
+def test_auth_query_retrieves_authentication_entry(tmp_path):
+    knowledge = tmp_path / "knowledge_base.json"
+    knowledge.write_text(json.dumps({
+        "security": {"title": "Security", "content": "Use token based authentication for remote servers"},
+        "resources": {"title": "Resources", "content": "Resources expose read-only data"},
+    }), encoding='utf-8')
+    kb = MCPKnowledgeBase(str(knowledge), str(tmp_path / "missing.json"),
+                          os.path.join(ROOT, "synonyms.json"))
+
+    results = kb.search_relevant_content("auth")
+
+    assert [result["key"] for result in results] == ["security"]
+
+
+@pytest.mark.parametrize("word", ["rust", "java", "node"])
+def test_off_domain_words_do_not_get_the_phrase_boost(knowledge_base, word):
+    results = knowledge_base.search_relevant_content(f"how do I use {word}")
+    assert all(result["similarity_score"] < 10.0 for result in results)
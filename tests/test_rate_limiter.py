@@ -0,0 +1,94 @@
+import threading
+
+from rate_limiter import (
+    AdmissionController, TokenBucket,
+    REJECT_QUEUE_FULL, REJECT_TIMEOUT, REJECT_USER_QUOTA,
+)
+
+
+def make_controller(**overrides):
+    settings = dict(requests_per_minute=6000, tokens_per_minute=1_000_000,
+                    user_requests_per_minute=60, user_burst=2, max_queue=8, max_wait=0.2)
+    settings.update(overrides)
+    return AdmissionController(**settings)
+
+
+def test_token_bucket_spends_and_refunds():
+    bucket = TokenBucket(rate=0, capacity=2)
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    bucket.refund()
+    assert bucket.try_acquire()
+
+
+def test_user_quota_is_enforced():
+    controller = make_controller()
+    assert controller.acquire("alice", 10) == (True, None)
+    assert controller.acquire("alice", 10) == (True, None)
+    assert controller.acquire("alice", 10) == (False, REJECT_USER_QUOTA)
+    # Other users have their own bucket
+    assert controller.acquire("bob", 10) == (True, None)
+
+
+def test_queue_full_refunds_user_quota():
+    controller = make_controller(max_queue=0, user_burst=1)
+    assert controller.acquire("alice", 10) == (False, REJECT_QUEUE_FULL)
+    controller.max_queue = 8
+    assert controller.acquire("alice", 10) == (True, None)
+
+
+def test_timeout_sheds_and_refunds_user_quota():
+    # One request per minute globally: the second caller cannot be admitted in time
+    controller = make_controller(requests_per_minute=1, user_burst=1, max_wait=0.05)
+    assert controller.acquire("alice", 10) == (True, None)
+    assert controller.acquire("bob", 10) == (False, REJECT_TIMEOUT)
+
+    controller.request_bucket.refund()
+    assert controller.acquire("bob", 10) == (True, None)
+
+
+def test_metrics_count_rejections():
+    controller = make_controller(requests_per_minute=1, max_queue=1, max_wait=0.3)
+    controller.acquire("alice", 10)
+
+    results = []
+    threads = [threading.Thread(target=lambda u=u: results.append(controller.acquire(u, 10)))
+               for u in ("bob", "carol", "dave")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    metrics = controller.get_metrics()
+    assert metrics["admitted"] == 1
+    assert metrics["rejected_queue_full"] + metrics["rejected_timeout"] == 3
+    assert metrics["rejected_total"] == 3
+    assert metrics["queue_depth"] == 0
+
+
+def test_idle_user_buckets_are_evicted():
+    controller = make_controller(user_requests_per_minute=6000, user_burst=1)
+    controller.eviction_interval = 0
+    controller.acquire("alice", 10)
+    assert "alice" in controller._user_buckets
+
+    # Refills in 10ms; the next call sweeps it away
+    threading.Event().wait(0.02)
+    controller.acquire("bob", 10)
+    assert "alice" not in controller._user_buckets
+    assert "bob" in controller._user_buckets
+
+
+def test_reconcile_never_overfills_token_bucket():
+    controller = make_controller(tokens_per_minute=1000)
+    controller.token_bucket.rate = 0
+    controller.reconcile(1000, 100)
+    assert controller.token_bucket.tokens == 1000
+
+    assert controller.acquire("alice", 600) == (True, None)
+    controller.reconcile(600, 100)
+    assert controller.token_bucket.tokens == 900
+
+    controller.reconcile(100, 500)
+    assert controller.token_bucket.tokens == 500